@@ -35,6 +35,13 @@ from utils import (
     load_records, save_records, load_goals, save_goals,
     calculate_improvement_rate, get_pb, format_time
 )
+from search_index import update_search_index, search, get_filter_options
+from storage_manager import (
+    resolve_video_path, touch_file, touch_files, generate_poster, get_poster, scan_storage, get_storage_usage,
+    quota_usage, archive_is_separate_volume, enforce_quota,
+    collect_garbage, run_storage_maintenance,
+    STORAGE_QUOTA_MB, ARCHIVE_AFTER_DAYS
+)
 
 # 메인 타이틀
 st.title("🏃 체대 입시 기록 관리 시스템")
@@ -44,7 +51,7 @@ st.markdown("---")
 st.sidebar.title("📋 메뉴")
 menu = st.sidebar.radio(
     "기능 선택",
-    ["📊 기록 입력", "📈 기록 비교 및 분석", "🎥 영상 관리", "💬 피드백", "📄 리포트"]
+    ["📊 기록 입력", "📈 기록 비교 및 분석", "🎥 영상 관리", "💬 피드백", "🔍 검색", "📄 리포트", "📥 내보내기"]
 )
 
 # 기록 입력 페이지
@@ -100,6 +107,7 @@ if menu == "📊 기록 입력":
         
         records_df = pd.concat([records_df, pd.DataFrame([new_record])], ignore_index=True)
         save_records(records_df)
+        update_search_index()
         st.session_state.records_df = records_df
         
         st.success(f"✅ {sport_type} 기록이 저장되었습니다!")
@@ -188,7 +196,7 @@ elif menu == "📈 기록 비교 및 분석":
 elif menu == "🎥 영상 관리":
     st.header("🎥 훈련 영상 관리")
     
-    tab1, tab2 = st.tabs(["영상 업로드", "영상 목록"])
+    tab1, tab2, tab3 = st.tabs(["영상 업로드", "영상 목록", "저장소 관리"])
     
     with tab1:
         st.subheader("영상 업로드")
@@ -238,7 +246,15 @@ elif menu == "🎥 영상 관리":
                 videos_df = pd.concat([videos_df, pd.DataFrame([new_video])], ignore_index=True)
                 save_records(videos_df, "data/videos_metadata.json")
                 
+                # 목록에 보여줄 포스터 이미지 생성
+                generate_poster(video_filename)
+                
+                # 할당량을 넘으면 오래 사용하지 않은 파생 파일 정리
+                quota = enforce_quota()
+                
                 st.success(f"✅ 영상이 저장되었습니다: {video_filename}")
+                if quota["over_quota"]:
+                    st.warning("⚠️ 디스크 할당량을 초과했지만 삭제할 수 있는 파생 파일이 없습니다. 저장소 관리 탭을 확인해주세요.")
     
     with tab2:
         st.subheader("저장된 영상 목록")
@@ -250,16 +266,31 @@ elif menu == "🎥 영상 관리":
         else:
             videos_df = videos_df.sort_values("날짜", ascending=False)
             
+            if 'touched_posters' not in st.session_state:
+                st.session_state.touched_posters = set()
+            shown_posters = []
+            
             for idx, row in videos_df.iterrows():
                 with st.expander(f"📹 {row['종목']} - {row['날짜']}"):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
-                        video_path = os.path.join("data/videos", row["파일명"])
-                        if os.path.exists(video_path):
+                        video_path = resolve_video_path(row["파일명"])
+                        if not os.path.exists(video_path):
+                            st.error("영상 파일을 찾을 수 없습니다.")
+                        elif st.session_state.get("playing_video") == row["파일명"]:
                             st.video(video_path)
                         else:
-                            st.error("영상 파일을 찾을 수 없습니다.")
+                            poster_path = get_poster(row["파일명"])
+                            if poster_path:
+                                st.image(poster_path)
+                                shown_posters.append(poster_path)
+                            
+                            if st.button("▶ 재생", key=f"play_{idx}"):
+                                # 실제로 재생할 때만 최근 접근 시간 기록
+                                touch_file(video_path)
+                                st.session_state.playing_video = row["파일명"]
+                                st.rerun()
                     
                     with col2:
                         st.write(f"**종목:** {row['종목']}")
@@ -272,6 +303,61 @@ elif menu == "🎥 영상 관리":
                         if st.button(f"피드백 보기", key=f"feedback_{idx}"):
                             st.session_state.selected_video = row["파일명"]
                             st.rerun()
+            
+            # 이번 세션에서 처음 보여준 포스터만 최근 접근 시간 기록 (한 번에 저장)
+            new_posters = [path for path in shown_posters if path not in st.session_state.touched_posters]
+            if new_posters:
+                touch_files(new_posters)
+                st.session_state.touched_posters.update(new_posters)
+    
+    with tab3:
+        st.subheader("저장소 사용량")
+        
+        storage_index = scan_storage()
+        usage = get_storage_usage(storage_index)
+        used_bytes = quota_usage(storage_index)
+        quota_bytes = STORAGE_QUOTA_MB * 1024 * 1024
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("할당량 사용량", f"{used_bytes / 1024 / 1024:.1f} MB")
+        with col2:
+            st.metric("원본 영상", f"{usage['original']['count']}개 / {usage['original']['size'] / 1024 / 1024:.1f} MB")
+        with col3:
+            st.metric("보관 영상", f"{usage['archived']['count']}개 / {usage['archived']['size'] / 1024 / 1024:.1f} MB")
+        with col4:
+            st.metric("파생 파일", f"{usage['derived']['count']}개 / {usage['derived']['size'] / 1024 / 1024:.1f} MB")
+        
+        st.progress(min(1.0, used_bytes / quota_bytes))
+        st.caption(f"할당량: {STORAGE_QUOTA_MB} MB | {ARCHIVE_AFTER_DAYS}일 이상 보지 않은 영상은 보관 디렉토리로 이동합니다.")
+        
+        if not archive_is_separate_volume():
+            st.info("ℹ️ 보관 디렉토리가 같은 디스크에 있어 영상 보관을 건너뜁니다. VIDEO_ARCHIVE_DIR을 다른 볼륨으로 설정하세요.")
+        
+        if used_bytes > quota_bytes and usage['derived']['count'] == 0:
+            st.error("⚠️ 할당량을 초과했지만 삭제할 수 있는 파생 파일이 없습니다.")
+        
+        orphans = collect_garbage(dry_run=True, index=storage_index)
+        if orphans:
+            st.warning(f"⚠️ 메타데이터에 없는 파일 {len(orphans)}개가 있습니다.")
+            with st.expander("정리 대상 파일 보기"):
+                for path in orphans:
+                    st.write(path)
+        
+        if st.button("저장소 정리 실행", type="primary"):
+            result = run_storage_maintenance()
+            st.success(
+                f"✅ 정리 완료: 고아 파일 {len(result['deleted'])}개 삭제, "
+                f"영상 {len(result['archived'])}개 보관, 파생 파일 {len(result['evicted'])}개 삭제"
+            )
+            if result["archive_skipped"]:
+                st.warning("⚠️ 보관 디렉토리가 같은 디스크에 있어 오래된 영상을 보관하지 않았습니다.")
+            if result["over_quota"]:
+                st.error(
+                    f"⚠️ 정리 후에도 할당량을 초과합니다 ({result['used'] / 1024 / 1024:.1f} MB / "
+                    f"{result['quota'] / 1024 / 1024:.0f} MB). 삭제할 수 있는 파생 파일이 없습니다."
+                )
 
 # 피드백 페이지
 elif menu == "💬 피드백":
@@ -293,8 +379,12 @@ elif menu == "💬 피드백":
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                video_path = os.path.join("data/videos", selected_filename)
+                video_path = resolve_video_path(selected_filename)
                 if os.path.exists(video_path):
+                    # 선택한 영상이 바뀌었을 때만 최근 접근 시간 기록
+                    if st.session_state.get("touched_video") != selected_filename:
+                        touch_file(video_path)
+                        st.session_state.touched_video = selected_filename
                     st.video(video_path)
                 else:
                     st.error("영상 파일을 찾을 수 없습니다.")
@@ -346,6 +436,7 @@ elif menu == "💬 피드백":
                 
                 feedbacks_df = pd.concat([feedbacks_df, pd.DataFrame([new_feedback])], ignore_index=True)
                 save_records(feedbacks_df, "data/feedback.json")
+                update_search_index()
                 
                 st.success("✅ 피드백이 저장되었습니다!")
             
@@ -366,6 +457,55 @@ elif menu == "💬 피드백":
                         st.caption(f"작성일: {fb['작성시간']}")
                         st.markdown("---")
 
+# 검색 페이지
+elif menu == "🔍 검색":
+    st.header("🔍 피드백 및 메모 검색")
+    
+    # 새로 추가된 피드백/기록만 인덱스에 반영
+    update_search_index()
+    options = get_filter_options()
+    
+    query = st.text_input("검색어", placeholder="예: 스타트, 도약")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        search_sports = st.multiselect("종목", options["종목"])
+        search_coaches = st.multiselect("코치명", options["코치명"])
+    
+    with col2:
+        search_types = st.multiselect("피드백 유형", options["피드백유형"])
+        use_date_filter = st.checkbox("날짜 범위 지정")
+        start_date, end_date = None, None
+        if use_date_filter:
+            start_date = st.date_input("시작 날짜", value=datetime.now().date().replace(month=1, day=1))
+            end_date = st.date_input("종료 날짜", value=datetime.now().date())
+    
+    if query:
+        results = search(
+            query,
+            sports=search_sports,
+            coaches=search_coaches,
+            feedback_types=search_types,
+            start_date=start_date,
+            end_date=end_date
+        )
+        
+        if not results:
+            st.info("검색 결과가 없습니다.")
+        else:
+            st.write(f"**검색 결과:** {len(results)}건")
+            for result in results:
+                with st.container():
+                    if result["출처"] == "피드백":
+                        st.markdown(f"**{result['피드백유형']}** · {result['종목']} - {result['코치명']}")
+                        st.caption(f"영상: {result['참조']} | 작성일: {result['날짜']}")
+                    else:
+                        st.markdown(f"**{result['피드백유형']}** · {result['종목']}")
+                        st.caption(f"기록 날짜: {result['날짜']}")
+                    st.write(result["내용"])
+                    st.markdown("---")
+
 # 리포트 페이지
 elif menu == "📄 리포트":
     st.header("📄 목표 달성률 리포트")
@@ -460,5 +600,48 @@ elif menu == "📄 리포트":
                         mime="application/pdf"
                     )
 
+# 내보내기 페이지
+# 기록 전체를 DataFrame으로 읽지 않고 내보내기 모듈이 파일을 나누어 읽습니다.
+elif menu == "📥 내보내기":
+    st.header("📥 전체 기록 내보내기")
+    
+    st.caption("전체 기록, 영상 정보, 피드백을 종목별 시트(엑셀) 또는 CSV로 내보냅니다.")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("📊 엑셀 파일 생성"):
+            from export_generator import generate_excel_export
+            
+            try:
+                xlsx_path = generate_excel_export()
+            except ValueError as e:
+                st.error(f"⚠️ 내보내기에 실패했습니다: {e}")
+            else:
+                with open(xlsx_path, "rb") as xlsx_file:
+                    st.download_button(
+                        label="엑셀 다운로드",
+                        data=xlsx_file,
+                        file_name=f"체대입시_전체기록_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+    
+    with col2:
+        if st.button("📄 CSV 파일 생성"):
+            from export_generator import generate_csv_export
+            
+            try:
+                csv_path = generate_csv_export()
+            except ValueError as e:
+                st.error(f"⚠️ 내보내기에 실패했습니다: {e}")
+            else:
+                with open(csv_path, "rb") as csv_file:
+                    st.download_button(
+                        label="CSV 다운로드 (ZIP)",
+                        data=csv_file,
+                        file_name=f"체대입시_전체기록_{datetime.now().strftime('%Y%m%d')}.zip",
+                        mime="application/zip"
+                    )
+
 
 
@@ -0,0 +1,277 @@
+"""
+내보내기 모듈
+전체 기록, 영상 메타데이터, 피드백을 Excel(XLSX)과 CSV로 내보내는 기능
+"""
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+from datetime import datetime
+import csv
+import io
+import os
+import re
+import zipfile
+
+from utils import iter_records, calculate_improvement_rate
+
+
+RECORDS_PATH = "data/records.json"
+VIDEOS_METADATA_PATH = "data/videos_metadata.json"
+FEEDBACK_PATH = "data/feedback.json"
+
+# 한 번에 읽어 쓰는 행 수
+EXPORT_CHUNK_SIZE = 1000
+
+RECORD_COLUMNS = ["날짜", "종목", "기록", "단위", "시간대", "날씨", "컨디션", "메모", "입력시간"]
+VIDEO_COLUMNS = ["파일명", "날짜", "종목", "기록", "설명", "업로드시간"]
+FEEDBACK_COLUMNS = ["종목", "영상파일명", "피드백유형", "시간", "내용", "코치명", "작성시간"]
+SUMMARY_COLUMNS = ["종목", "기록 수", "단위", "최고 기록", "첫 기록", "최근 기록", "향상률(%)", "영상 수", "피드백 수"]
+
+UNKNOWN_SPORT = "미분류"
+
+# 엑셀 시트 최대 행 수 (머리글 포함)
+EXCEL_MAX_ROWS = 1048576
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _new_sport_stats():
+    return {
+        "count": 0, "unit": "", "best": None,
+        "first": None, "first_key": None, "latest": None, "latest_key": None,
+        "videos": 0, "feedbacks": 0
+    }
+
+
+def _update_record_stats(stats, sport, row):
+    """기록 한 행으로 종목별 요약 통계를 갱신합니다.
+
+    첫 기록/최근 기록은 파일 순서가 아니라 (날짜, 입력시간) 순서로 정합니다.
+    """
+    value = row.get("기록")
+    if value is None:
+        return
+
+    stats["count"] += 1
+    key = (str(row.get("날짜") or ""), str(row.get("입력시간") or ""))
+    if stats["first"] is None or key < stats["first_key"]:
+        stats["first"] = value
+        stats["first_key"] = key
+        stats["unit"] = row.get("단위") or ""
+    if stats["latest"] is None or key >= stats["latest_key"]:
+        stats["latest"] = value
+        stats["latest_key"] = key
+
+    # 시간 종목 (초 단위) - 값이 작을수록 좋음
+    if stats["best"] is None:
+        stats["best"] = value
+    elif sport in ["100m", "200m", "400m", "800m", "1500m", "3000m"]:
+        stats["best"] = min(stats["best"], value)
+    else:
+        stats["best"] = max(stats["best"], value)
+
+
+def _clean(value):
+    """엑셀에 쓸 수 없는 제어 문자를 제거합니다."""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def _csv_safe(value):
+    """CSV를 엑셀로 열 때 수식으로 실행되지 않도록 =, +, -, @로 시작하는 문자열 앞에 '를 붙입니다."""
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+
+class _SheetWriter:
+    """종목별 시트를 필요할 때 만들어 행을 추가하는 도우미
+
+    시트가 엑셀 최대 행 수에 도달하면 "기록_100m(2)"처럼 이어지는 시트를 만듭니다.
+    """
+
+    def __init__(self, workbook, max_rows=EXCEL_MAX_ROWS):
+        self.workbook = workbook
+        self.max_rows = max_rows
+        self.sheets = {}
+        self.used_names = set()
+
+    def _sheet_name(self, title, part=1):
+        # 엑셀 시트 이름은 31자 이하, 일부 특수문자 불가
+        title = _INVALID_SHEET_CHARS.sub("_", title)
+        suffix = part
+        while True:
+            tail = f"({suffix})" if suffix > 1 else ""
+            name = title[:31 - len(tail)] + tail
+            if name not in self.used_names:
+                break
+            suffix += 1
+        self.used_names.add(name)
+        return name
+
+    def create(self, title, columns, part=1):
+        worksheet = self.workbook.create_sheet(self._sheet_name(title, part))
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(worksheet, value=column)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        worksheet.append(header)
+        return worksheet
+
+    def append(self, key, title, columns, values):
+        sheet = self.sheets.get(key)
+        if sheet is None:
+            sheet = self.sheets[key] = {"worksheet": self.create(title, columns), "rows": 1, "part": 1}
+        elif sheet["rows"] >= self.max_rows:
+            sheet["part"] += 1
+            sheet["worksheet"] = self.create(title, columns, sheet["part"])
+            sheet["rows"] = 1
+
+        worksheet = sheet["worksheet"]
+        row = []
+        for value in values:
+            value = _clean(value)
+            if isinstance(value, str) and value.startswith("="):
+                # 사용자가 입력한 글은 수식이 아니라 문자열로 저장
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.data_type = "s"
+                value = cell
+            row.append(value)
+        worksheet.append(row)
+        sheet["rows"] += 1
+
+
+def generate_excel_export(records_path=RECORDS_PATH, videos_path=VIDEOS_METADATA_PATH,
+                          feedback_path=FEEDBACK_PATH, chunk_size=EXPORT_CHUNK_SIZE):
+    """전체 기록, 영상, 피드백을 종목별 시트로 나누어 XLSX 파일로 내보냅니다.
+
+    openpyxl write-only 모드로 행을 바로 디스크에 쓰기 때문에
+    기록이 많아도 메모리 사용량이 일정합니다. 원본 파일을 끝까지 읽을 수
+    없으면 ValueError가 발생하며 파일을 만들지 않습니다.
+    """
+
+    # 파일 경로 설정
+    filename = f"data/export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    workbook = Workbook(write_only=True)
+    writer = _SheetWriter(workbook)
+
+    try:
+        # 요약 시트는 맨 앞에 두고 마지막에 채움
+        summary_sheet = writer.create("종목별 요약", SUMMARY_COLUMNS)
+        stats = {}
+
+        # 기록
+        for chunk in iter_records(records_path, chunk_size):
+            for row in chunk:
+                sport = row.get("종목") or UNKNOWN_SPORT
+                _update_record_stats(stats.setdefault(sport, _new_sport_stats()), sport, row)
+                writer.append(("기록", sport), f"기록_{sport}", RECORD_COLUMNS,
+                              [row.get(column) for column in RECORD_COLUMNS])
+
+        # 영상 메타데이터 (피드백의 종목을 찾기 위해 파일명 -> 종목 저장)
+        video_sports = {}
+        for chunk in iter_records(videos_path, chunk_size):
+            for row in chunk:
+                sport = row.get("종목") or UNKNOWN_SPORT
+                video_sports[row.get("파일명")] = sport
+                stats.setdefault(sport, _new_sport_stats())["videos"] += 1
+                writer.append(("영상", sport), f"영상_{sport}", VIDEO_COLUMNS,
+                              [row.get(column) for column in VIDEO_COLUMNS])
+
+        # 피드백
+        for chunk in iter_records(feedback_path, chunk_size):
+            for row in chunk:
+                sport = video_sports.get(row.get("영상파일명"), UNKNOWN_SPORT)
+                stats.setdefault(sport, _new_sport_stats())["feedbacks"] += 1
+                row = dict(row, 종목=sport)
+                writer.append(("피드백", sport), f"피드백_{sport}", FEEDBACK_COLUMNS,
+                              [row.get(column) for column in FEEDBACK_COLUMNS])
+
+        # 종목별 요약
+        for sport, sport_stats in stats.items():
+            improvement = None
+            if sport_stats["count"]:
+                improvement = round(calculate_improvement_rate(sport_stats["first"], sport_stats["latest"], sport), 2)
+
+            summary_sheet.append([
+                sport,
+                sport_stats["count"],
+                sport_stats["unit"],
+                sport_stats["best"],
+                sport_stats["first"],
+                sport_stats["latest"],
+                improvement,
+                sport_stats["videos"],
+                sport_stats["feedbacks"]
+            ])
+
+        workbook.save(filename)
+    except Exception:
+        # write-only 시트의 임시 파일은 저장할 때 정리되므로 버리는 곳에 저장한 뒤 다시 발생
+        try:
+            workbook.save(os.devnull)
+        except Exception:
+            pass
+        if os.path.exists(filename):
+            os.remove(filename)
+        raise
+
+    return filename
+
+
+def _write_csv(archive, name, columns, rows):
+    """행을 스트리밍하여 ZIP 안의 CSV 파일로 씁니다. (엑셀 호환을 위해 BOM 포함)"""
+    with archive.open(name, 'w') as raw:
+        with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as f:
+            csv_writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            csv_writer.writeheader()
+            for row in rows:
+                csv_writer.writerow({column: _csv_safe(row.get(column)) for column in columns})
+
+
+def _iter_rows(filepath, chunk_size):
+    for chunk in iter_records(filepath, chunk_size):
+        yield from chunk
+
+
+def generate_csv_export(records_path=RECORDS_PATH, videos_path=VIDEOS_METADATA_PATH,
+                        feedback_path=FEEDBACK_PATH, chunk_size=EXPORT_CHUNK_SIZE):
+    """전체 기록, 영상, 피드백을 CSV 파일로 만들어 ZIP 하나로 내보냅니다.
+
+    원본 파일을 끝까지 읽을 수 없으면 ValueError가 발생하며 ZIP 파일을 지웁니다.
+    """
+
+    # 파일 경로 설정
+    filename = f"data/export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    video_sports = {}
+    try:
+        with zipfile.ZipFile(filename, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            _write_csv(archive, "records.csv", RECORD_COLUMNS, _iter_rows(records_path, chunk_size))
+
+            def videos():
+                for row in _iter_rows(videos_path, chunk_size):
+                    video_sports[row.get("파일명")] = row.get("종목") or UNKNOWN_SPORT
+                    yield row
+
+            _write_csv(archive, "videos.csv", VIDEO_COLUMNS, videos())
+
+            feedbacks = (
+                dict(row, 종목=video_sports.get(row.get("영상파일명"), UNKNOWN_SPORT))
+                for row in _iter_rows(feedback_path, chunk_size)
+            )
+            _write_csv(archive, "feedback.csv", FEEDBACK_COLUMNS, feedbacks)
+    except Exception:
+        # 일부만 내보낸 파일이 남지 않도록 삭제
+        if os.path.exists(filename):
+            os.remove(filename)
+        raise
+
+    return filename
@@ -0,0 +1,651 @@
+"""
+검색 인덱스 모듈
+코치 피드백 내용과 기록 메모를 대상으로 한 전문 검색 기능
+"""
+
+import hashlib
+import json
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+
+INDEX_PATH = "data/search_index.pkl"
+FEEDBACK_PATH = "data/feedback.json"
+RECORDS_PATH = "data/records.json"
+VIDEOS_METADATA_PATH = "data/videos_metadata.json"
+
+INDEX_VERSION = 3
+RECORD_MEMO_TYPE = "기록 메모"
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 새로 추가된 문서는 작은 세그먼트로 델타 파일에 덧붙이고,
+# 세그먼트가 많아지거나 델타가 커지면 합칩니다.
+MAX_DELTA_SEGMENTS = 16
+COMPACT_MIN_DOCS = 1000
+COMPACT_RATIO = 0.1
+
+# 문서 필드 (열 단위로 저장)
+DOC_FIELDS = ["source", "sport", "coach", "type", "date", "text", "ref"]
+SOURCE_NAMES = ["videos", "feedback", "records"]
+
+_TOKEN_SPLIT = re.compile(r"[\W_]+")
+_JSON_DECODER = json.JSONDecoder()
+
+# 메모리에 로드된 인덱스 캐시 (경로 -> 인덱스)
+# 인덱스와 세그먼트는 만든 뒤 수정하지 않고 새 객체로 교체하므로 여러 세션이 함께 읽어도 안전합니다.
+_index_cache = {}
+
+# Streamlit 세션은 한 프로세스의 여러 스레드에서 실행되므로 갱신은 한 번에 하나씩
+_update_lock = threading.Lock()
+
+
+def tokenize(text):
+    """텍스트를 문자 바이그램 토큰 목록으로 변환합니다.
+
+    한국어는 조사/어미가 붙어 띄어쓰기 단위로는 검색이 잘 되지 않으므로
+    단어마다 두 글자씩 잘라 색인합니다. 한 글자 단어는 그대로 사용합니다.
+    """
+    tokens = []
+    if not text:
+        return tokens
+
+    for word in _TOKEN_SPLIT.split(str(text).lower()):
+        if not word:
+            continue
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+
+    return tokens
+
+
+def _file_stat(filepath):
+    """파일 변경 여부 확인용 (수정시각, 크기)를 반환합니다."""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_bytes(filepath):
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def _parse_rows(data, offset):
+    """JSON 배열 파일 내용(bytes)에서 offset 이후의 행을 읽습니다.
+
+    (행 목록, 마지막으로 읽은 행의 끝 위치)를 반환합니다. 파일이 저장
+    중이라 끝이 잘려 있으면 읽을 수 있는 행까지만 반환합니다.
+    """
+    text = data[offset:].decode('utf-8', errors='replace')
+    rows = []
+    pos = 0
+    end = 0
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,[':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            break
+        try:
+            row, pos = _JSON_DECODER.raw_decode(text, pos)
+        except ValueError:
+            break
+        if isinstance(row, dict):
+            rows.append(row)
+        end = pos
+
+    return rows, offset + len(text[:end].encode('utf-8'))
+
+
+def _text(value):
+    """결측값(None, NaN)을 빈 문자열로 바꿉니다."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+def _feedback_documents(rows, video_sports):
+    for row in rows:
+        yield (
+            "피드백",
+            video_sports.get(_text(row.get("영상파일명")), ""),
+            _text(row.get("코치명")),
+            _text(row.get("피드백유형")),
+            _text(row.get("작성시간"))[:10],
+            _text(row.get("내용")),
+            _text(row.get("영상파일명"))
+        )
+
+
+def _record_documents(rows):
+    for row in rows:
+        yield (
+            "기록",
+            _text(row.get("종목")),
+            "",
+            RECORD_MEMO_TYPE,
+            _text(row.get("날짜"))[:10],
+            _text(row.get("메모")),
+            _text(row.get("입력시간"))
+        )
+
+
+def _build_columns(docs):
+    """필터에 쓰는 numpy 배열을 만듭니다."""
+    return {
+        "sport": np.array(docs["sport"], dtype=str),
+        "coach": np.array(docs["coach"], dtype=str),
+        "type": np.array(docs["type"], dtype=str),
+        "date": np.array(docs["date"], dtype="U10")
+    }
+
+
+def _finish_segment(docs, lengths, vocab, post_ids, post_tfs):
+    return {
+        "docs": docs,
+        "lengths": lengths,
+        "vocab": vocab,
+        "post_ids": post_ids,
+        "post_tfs": post_tfs,
+        "columns": _build_columns(docs)
+    }
+
+
+def _build_segment(documents):
+    """문서 목록으로 세그먼트 하나를 만듭니다. 문서번호는 세그먼트 안에서 0부터 시작합니다.
+
+    포스팅은 토큰별로 post_ids/post_tfs 배열의 연속 구간에 문서번호 순으로 저장됩니다.
+    """
+    docs = {field: [] for field in DOC_FIELDS}
+    lengths = []
+    postings = {}
+
+    for document in documents:
+        tokens = tokenize(document[DOC_FIELDS.index("text")])
+        if not tokens:
+            continue
+
+        doc_id = len(lengths)
+        for field, value in zip(DOC_FIELDS, document):
+            docs[field].append(value)
+        lengths.append(len(tokens))
+
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            ids, tfs = postings.setdefault(token, ([], []))
+            ids.append(doc_id)
+            tfs.append(count)
+
+    if not lengths:
+        return None
+
+    vocab = {}
+    all_ids, all_tfs = [], []
+    for token, (ids, tfs) in postings.items():
+        vocab[token] = (len(all_ids), len(all_ids) + len(ids))
+        all_ids.extend(ids)
+        all_tfs.extend(tfs)
+
+    return _finish_segment(
+        docs,
+        np.array(lengths, dtype=np.int32),
+        vocab,
+        np.array(all_ids, dtype=np.int32),
+        np.array(all_tfs, dtype=np.int32)
+    )
+
+
+def _merge_segments(segments):
+    """여러 세그먼트를 하나로 합칩니다."""
+    segments = [segment for segment in segments if segment]
+    if not segments:
+        return None
+    if len(segments) == 1:
+        return segments[0]
+
+    docs = {field: [] for field in DOC_FIELDS}
+    token_ids = {}
+    token_columns, id_columns, tf_columns = [], [], []
+    base = 0
+
+    for segment in segments:
+        for field in DOC_FIELDS:
+            docs[field].extend(segment["docs"][field])
+
+        vocab = segment["vocab"]
+        starts = np.array([start for start, _ in vocab.values()], dtype=np.int64)
+        ends = np.array([end for _, end in vocab.values()], dtype=np.int64)
+        indexes = np.array([token_ids.setdefault(token, len(token_ids)) for token in vocab], dtype=np.int64)
+
+        # 세그먼트 배열은 토큰 구간이 이어져 있으므로 위치 순으로 토큰 번호를 펼칩니다.
+        order = np.argsort(starts)
+        token_columns.append(np.repeat(indexes[order], (ends - starts)[order]))
+        id_columns.append(segment["post_ids"] + base)
+        tf_columns.append(segment["post_tfs"])
+        base += len(segment["lengths"])
+
+    tokens = np.concatenate(token_columns)
+    order = np.argsort(tokens, kind='stable')
+    post_ids = np.concatenate(id_columns)[order].astype(np.int32)
+    post_tfs = np.concatenate(tf_columns)[order].astype(np.int32)
+
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(tokens, minlength=len(token_ids)))])
+    vocab = {token: (int(bounds[i]), int(bounds[i + 1])) for token, i in token_ids.items()}
+
+    return _finish_segment(
+        docs,
+        np.concatenate([segment["lengths"] for segment in segments]),
+        vocab,
+        post_ids,
+        post_tfs
+    )
+
+
+def _empty_sources():
+    return {
+        name: {"stat": None, "offset": 0, "prefix_hash": hashlib.sha1().hexdigest()}
+        for name in SOURCE_NAMES
+    }
+
+
+def _empty_index():
+    return {
+        "generation": 0,
+        "sources": _empty_sources(),
+        "video_sports": {},
+        "base_segment": None,
+        "delta_segments": [],
+        "base_stat": None,
+        "delta_size": 0
+    }
+
+
+def _derive(index, **changes):
+    """바뀐 항목을 반영한 새 인덱스를 만듭니다. (캐시된 필터 목록은 버림)"""
+    index = dict(index, **changes)
+    index.pop("_options", None)
+    return index
+
+
+def _delta_path(index_path):
+    return index_path + ".delta"
+
+
+def _read_delta(index, delta_path, start):
+    """델타 파일의 start 위치부터 레코드를 읽어 인덱스에 반영한 새 인덱스를 반환합니다."""
+    index = _derive(index, sources=dict(index["sources"]), video_sports=dict(index["video_sports"]),
+                 delta_segments=list(index["delta_segments"]))
+    try:
+        with open(delta_path, 'rb') as f:
+            f.seek(start)
+            while True:
+                position = f.tell()
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception:
+                    # 저장 중 끊긴 레코드는 무시
+                    f.seek(position)
+                    break
+                if record.get("generation") != index["generation"]:
+                    continue
+                if record["segment"]:
+                    index["delta_segments"].append(record["segment"])
+                index["sources"] = record["sources"]
+                index["video_sports"].update(record["video_sports"])
+            index["delta_size"] = f.tell()
+    except OSError:
+        index["delta_size"] = 0
+    return index
+
+
+def _load_index(index_path):
+    """디스크의 인덱스를 로드합니다.
+
+    기본 파일이 그대로면 캐시를 재사용하고, 델타 파일에 새로 덧붙은 레코드만 읽습니다.
+    """
+    delta_path = _delta_path(index_path)
+    base_stat = _file_stat(index_path)
+    if base_stat is None:
+        return _empty_index()
+
+    delta_size = (_file_stat(delta_path) or [0, 0])[1]
+    cached = _index_cache.get(index_path)
+    if cached and cached["base_stat"] == base_stat:
+        if cached["delta_size"] == delta_size:
+            return cached
+        if cached["delta_size"] < delta_size:
+            index = _read_delta(cached, delta_path, cached["delta_size"])
+            _index_cache[index_path] = index
+            return index
+
+    try:
+        with open(index_path, 'rb') as f:
+            base = pickle.load(f)
+    except:
+        return _empty_index()
+
+    if not isinstance(base, dict) or base.get("version") != INDEX_VERSION:
+        return _empty_index()
+
+    index = dict(_empty_index(), generation=base["generation"], sources=base["sources"],
+                 video_sports=base["video_sports"], base_segment=base["segment"], base_stat=base_stat)
+    index = _read_delta(index, delta_path, 0)
+    _index_cache[index_path] = index
+    return index
+
+
+def _write_atomic(path, payloads):
+    """레코드들을 임시 파일에 쓴 뒤 교체하여 저장합니다."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+        for payload in payloads:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path = f.name
+    os.replace(tmp_path, path)
+
+
+def _save_base(index, index_path):
+    """모든 세그먼트를 하나로 합쳐 기본 파일에 저장하고 델타 파일을 비웁니다."""
+    generation = index["generation"] + 1
+    segment = _merge_segments([index["base_segment"]] + index["delta_segments"])
+    _write_atomic(index_path, [{
+        "version": INDEX_VERSION,
+        "generation": generation,
+        "sources": index["sources"],
+        "video_sports": index["video_sports"],
+        "segment": segment
+    }])
+    # 세대 번호가 바뀌었으므로 델타 파일이 남아 있어도 다시 읽히지 않습니다.
+    _write_atomic(_delta_path(index_path), [])
+
+    index = _derive(index, generation=generation, base_segment=segment, delta_segments=[],
+                 base_stat=_file_stat(index_path), delta_size=0)
+    _index_cache[index_path] = index
+    return index
+
+
+def _append_delta(index, index_path, segment, video_sports):
+    """새 세그먼트를 델타 파일에 덧붙입니다."""
+    delta_path = _delta_path(index_path)
+    record = {
+        "generation": index["generation"],
+        "segment": segment,
+        "sources": index["sources"],
+        "video_sports": video_sports
+    }
+    with open(delta_path, 'ab') as f:
+        pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        delta_size = f.tell()
+
+    delta_segments = index["delta_segments"] + ([segment] if segment else [])
+    index = _derive(index, delta_segments=delta_segments, delta_size=delta_size)
+
+    if len(delta_segments) > MAX_DELTA_SEGMENTS:
+        # 작은 델타 세그먼트들을 하나로 합쳐 델타 파일을 다시 씀
+        merged = _merge_segments(delta_segments)
+        _write_atomic(delta_path, [{
+            "generation": index["generation"],
+            "segment": merged,
+            "sources": index["sources"],
+            "video_sports": index["video_sports"]
+        }])
+        index = _derive(index, delta_segments=[merged], delta_size=_file_stat(delta_path)[1])
+
+    _index_cache[index_path] = index
+    return index
+
+
+def _doc_count(segment):
+    return len(segment["lengths"]) if segment else 0
+
+
+def update_search_index(index_path=INDEX_PATH, feedback_path=FEEDBACK_PATH,
+                        records_path=RECORDS_PATH, videos_path=VIDEOS_METADATA_PATH):
+    """피드백/기록 파일에 새로 추가된 행만 인덱스에 반영합니다.
+
+    원본 파일의 수정시각과 크기가 그대로면 파일을 읽지 않습니다. 바뀐 경우
+    이미 색인한 부분(바이트 구간)의 해시를 비교하여 같으면 그 뒤에 덧붙은
+    행만 읽어 델타 세그먼트로 저장하고, 다르면(기존 행 수정/삭제)
+    인덱스를 처음부터 다시 만듭니다. 인덱스에 추가된 문서 수를 반환합니다.
+    """
+    with _update_lock:
+        index = _load_index(index_path)
+        paths = {"videos": videos_path, "feedback": feedback_path, "records": records_path}
+        stats = {name: _file_stat(path) for name, path in paths.items()}
+
+        if index["base_stat"] and all(index["sources"][name]["stat"] == stats[name] for name in SOURCE_NAMES):
+            return 0
+
+        contents = {name: _read_bytes(path) for name, path in paths.items()}
+
+        # 이미 색인한 구간이 그대로인지 확인
+        digests = {}
+        rebuild = False
+        for name in SOURCE_NAMES:
+            offset = index["sources"][name]["offset"]
+            digests[name] = hashlib.sha1(contents[name][:offset])
+            if len(contents[name]) < offset or digests[name].hexdigest() != index["sources"][name]["prefix_hash"]:
+                rebuild = True
+
+        if rebuild:
+            index = dict(_empty_index(), generation=index["generation"])
+            digests = {name: hashlib.sha1() for name in SOURCE_NAMES}
+
+        # 덧붙은 행만 읽음 (영상 메타데이터를 먼저 읽어 피드백의 종목을 찾음)
+        sources = {}
+        new_rows = {}
+        for name in SOURCE_NAMES:
+            offset = index["sources"][name]["offset"]
+            new_rows[name], end = _parse_rows(contents[name], offset)
+            digests[name].update(contents[name][offset:end])
+            sources[name] = {"stat": stats[name], "offset": end, "prefix_hash": digests[name].hexdigest()}
+
+        added_sports = {_text(row.get("파일명")): _text(row.get("종목")) for row in new_rows["videos"]}
+        video_sports = dict(index["video_sports"], **added_sports)
+
+        documents = list(_feedback_documents(new_rows["feedback"], video_sports))
+        documents.extend(_record_documents(new_rows["records"]))
+        segment = _build_segment(documents)
+
+        index = _derive(index, sources=sources, video_sports=video_sports)
+        base_docs = _doc_count(index["base_segment"])
+        delta_docs = sum(_doc_count(s) for s in index["delta_segments"]) + _doc_count(segment)
+
+        if rebuild or not index["base_stat"] or delta_docs > max(COMPACT_MIN_DOCS, COMPACT_RATIO * base_docs):
+            index = _derive(index, delta_segments=index["delta_segments"] + ([segment] if segment else []))
+            _save_base(index, index_path)
+        else:
+            _append_delta(index, index_path, segment, added_sports)
+
+        return _doc_count(segment)
+
+
+def rebuild_search_index(index_path=INDEX_PATH, **paths):
+    """인덱스를 삭제하고 처음부터 다시 만듭니다."""
+    with _update_lock:
+        for path in [index_path, _delta_path(index_path)]:
+            if os.path.exists(path):
+                os.remove(path)
+        _index_cache.pop(index_path, None)
+    return update_search_index(index_path=index_path, **paths)
+
+
+def _segments(index):
+    return [segment for segment in [index["base_segment"]] + index["delta_segments"] if segment]
+
+
+def _posting(segment, token):
+    start, end = segment["vocab"].get(token, (0, 0))
+    return segment["post_ids"][start:end], segment["post_tfs"][start:end]
+
+
+def _char_postings(segment, char):
+    """한 글자 검색어를 포함하는 토큰들의 문서번호 합집합을 반환합니다."""
+    post_ids = segment["post_ids"]
+    pieces = [post_ids[start:end] for token, (start, end) in segment["vocab"].items() if char in token]
+    if not pieces:
+        return np.zeros(0, dtype=np.int32)
+    return np.unique(np.concatenate(pieces))
+
+
+def _as_list(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _search_segment(segment, bigrams, unigrams, idfs, avg_length, filters):
+    """세그먼트 하나에서 모든 검색어를 포함하는 문서와 점수를 구합니다."""
+    postings = sorted(
+        ((idfs[token],) + _posting(segment, token) for token in bigrams),
+        key=lambda posting: len(posting[1])
+    )
+
+    # 가장 짧은 포스팅부터 교집합을 구하며 각 포스팅의 빈도를 함께 추립니다.
+    if postings:
+        _, candidates, first_tfs = postings[0]
+        tf_columns = [first_tfs]
+        for _, ids, tfs in postings[1:]:
+            if not len(candidates):
+                break
+            pos = np.minimum(np.searchsorted(ids, candidates), max(len(ids) - 1, 0))
+            mask = ids[pos] == candidates if len(ids) else np.zeros(len(candidates), dtype=bool)
+            candidates = candidates[mask]
+            tf_columns = [column[mask] for column in tf_columns] + [tfs[pos[mask]]]
+    else:
+        candidates = np.arange(len(segment["lengths"]), dtype=np.int32)
+        tf_columns = []
+
+    columns = segment["columns"]
+    mask = np.ones(len(candidates), dtype=bool)
+    for name, values in filters["values"]:
+        mask &= np.isin(columns[name][candidates], values)
+    if filters["start_date"]:
+        mask &= columns["date"][candidates] >= filters["start_date"]
+    if filters["end_date"]:
+        mask &= columns["date"][candidates] <= filters["end_date"]
+    for char in unigrams:
+        mask &= np.isin(candidates, _char_postings(segment, char), assume_unique=True)
+
+    candidates = candidates[mask]
+    scores = np.zeros(len(candidates))
+    if len(candidates) and postings:
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * segment["lengths"][candidates] / avg_length)
+        for (idf, _, _), tfs in zip(postings, tf_columns):
+            tfs = tfs[mask]
+            scores += idf * tfs / (tfs + norms)
+
+    return candidates, scores
+
+
+def search(query, sports=None, coaches=None, feedback_types=None,
+           start_date=None, end_date=None, limit=50, index_path=INDEX_PATH):
+    """피드백 내용과 기록 메모를 검색합니다.
+
+    검색어의 모든 바이그램을 포함하는 문서를 BM25 점수 순으로 반환합니다.
+    종목, 코치명, 피드백 유형은 값 하나 또는 목록으로, 날짜는
+    "YYYY-MM-DD" 문자열 또는 date 객체로 필터링할 수 있습니다.
+    """
+    segments = _segments(_load_index(index_path))
+    total_docs = sum(_doc_count(segment) for segment in segments)
+    if not total_docs:
+        return []
+
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return []
+
+    # 바이그램은 포스팅으로, 한 글자 검색어는 그 글자를 포함한 토큰들의 포스팅으로 찾습니다.
+    bigrams = [token for token in tokens if len(token) > 1]
+    unigrams = [token for token in tokens if len(token) == 1]
+
+    # 문서 빈도와 평균 길이는 전체 세그먼트 기준
+    idfs = {}
+    for token in bigrams:
+        df = sum(len(_posting(segment, token)[0]) for segment in segments)
+        if not df:
+            return []
+        idfs[token] = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+    avg_length = sum(int(segment["lengths"].sum()) for segment in segments) / total_docs
+
+    filters = {
+        "values": [
+            (name, values) for name, values in
+            [("sport", _as_list(sports)), ("coach", _as_list(coaches)), ("type", _as_list(feedback_types))]
+            if values
+        ],
+        "start_date": str(start_date) if start_date else None,
+        "end_date": str(end_date) if end_date else None
+    }
+
+    hits = []
+    for segment_no, segment in enumerate(segments):
+        candidates, scores = _search_segment(segment, bigrams, unigrams, idfs, avg_length, filters)
+        if len(candidates):
+            hits.append((segment_no, candidates, scores))
+    if not hits:
+        return []
+
+    segment_nos = np.concatenate([np.full(len(c), n) for n, c, _ in hits])
+    candidates = np.concatenate([c for _, c, _ in hits])
+    scores = np.concatenate([s for _, _, s in hits])
+
+    # 상위 limit개만 골라 점수, 날짜 순으로 정렬
+    if len(candidates) > limit:
+        top = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        top = np.arange(len(candidates))
+    dates = np.array([segments[segment_nos[i]]["docs"]["date"][candidates[i]] for i in top.tolist()], dtype="U10")
+    top = top[np.lexsort((dates, scores[top]))[::-1]]
+
+    results = []
+    for i in top.tolist():
+        docs = segments[segment_nos[i]]["docs"]
+        doc_id = int(candidates[i])
+        results.append({
+            "출처": docs["source"][doc_id],
+            "종목": docs["sport"][doc_id],
+            "코치명": docs["coach"][doc_id],
+            "피드백유형": docs["type"][doc_id],
+            "날짜": docs["date"][doc_id],
+            "내용": docs["text"][doc_id],
+            "참조": docs["ref"][doc_id],
+            "점수": round(float(scores[i]) * (BM25_K1 + 1), 3)
+        })
+
+    return results
+
+
+def get_filter_options(index_path=INDEX_PATH):
+    """검색 필터에 사용할 종목, 코치명, 피드백 유형 목록을 반환합니다."""
+    index = _load_index(index_path)
+    if "_options" not in index:
+        options = {"종목": set(), "코치명": set(), "피드백유형": set()}
+        for segment in _segments(index):
+            options["종목"].update(segment["docs"]["sport"])
+            options["코치명"].update(segment["docs"]["coach"])
+            options["피드백유형"].update(segment["docs"]["type"])
+        index["_options"] = {key: sorted(values - {""}) for key, values in options.items()}
+    return index["_options"]
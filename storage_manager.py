@@ -0,0 +1,394 @@
+"""
+저장소 관리 모듈
+영상 파일 용량 추적, 할당량 초과 시 파생 파일 정리, 오래된 영상 보관, 고아 파일 정리
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import cv2
+
+
+VIDEOS_DIR = "data/videos"
+DERIVED_DIR = "data/derived"
+ARCHIVE_DIR = os.environ.get("VIDEO_ARCHIVE_DIR", "data/archive/videos")
+VIDEOS_METADATA_PATH = "data/videos_metadata.json"
+STORAGE_INDEX_PATH = "data/storage_index.json"
+
+# 파생 파일 종류 (미리보기, 포스터, 스냅샷)
+DERIVED_KINDS = ["previews", "posters", "snapshots"]
+
+# 디스크 할당량 (MB) 및 원본 영상 보관 기준 (일)
+STORAGE_QUOTA_MB = int(os.environ.get("STORAGE_QUOTA_MB", "10240"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+
+# 포스터 이미지 최대 너비 (픽셀)
+POSTER_WIDTH = 640
+
+# 업로드 직후 메타데이터가 저장되기 전의 파일을 지우지 않도록 하는 유예 시간 (초)
+GC_GRACE_SECONDS = 3600
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def load_storage_index(filepath=STORAGE_INDEX_PATH):
+    """파일별 용량/최근 접근 시간 정보를 로드합니다."""
+    if os.path.exists(filepath):
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+    return {}
+
+
+def save_storage_index(index, filepath=STORAGE_INDEX_PATH):
+    """파일별 용량/최근 접근 시간 정보를 저장합니다."""
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix=".tmp", delete=False) as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+        tmp_path = f.name
+    os.replace(tmp_path, filepath)
+
+
+def derived_artifact_path(kind, video_filename, extension):
+    """영상에서 파생된 파일(미리보기 등)의 저장 경로를 반환합니다.
+
+    파생 파일 이름은 "원본파일명.확장자" 형식이며, 원본 영상이 삭제되면
+    collect_garbage()에서 함께 정리됩니다.
+    """
+    if kind not in DERIVED_KINDS:
+        raise ValueError(f"알 수 없는 파생 파일 종류입니다: {kind}")
+    directory = os.path.join(DERIVED_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{video_filename}.{extension.lstrip('.')}")
+
+
+def generate_poster(video_filename):
+    """영상 길이의 10% 지점 프레임을 포스터 이미지(JPEG)로 저장합니다.
+
+    포스터는 파생 파일이므로 할당량을 넘으면 enforce_quota()에서 먼저
+    삭제되며, get_poster()로 다시 만들 수 있습니다.
+    포스터 경로를 반환하고, 영상을 읽을 수 없으면 None을 반환합니다.
+    """
+    capture = cv2.VideoCapture(resolve_video_path(video_filename))
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if frame_count > 1:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 10)
+        ok, frame = capture.read()
+    finally:
+        capture.release()
+
+    if not ok or frame is None:
+        return None
+
+    height, width = frame.shape[:2]
+    if width > POSTER_WIDTH:
+        frame = cv2.resize(frame, (POSTER_WIDTH, int(height * POSTER_WIDTH / width)), interpolation=cv2.INTER_AREA)
+
+    poster_path = derived_artifact_path("posters", video_filename, "jpg")
+    if not cv2.imwrite(poster_path, frame):
+        return None
+    return poster_path
+
+
+def get_poster(video_filename):
+    """영상의 포스터 경로를 반환합니다. 정리되어 없으면 다시 만듭니다."""
+    poster_path = derived_artifact_path("posters", video_filename, "jpg")
+    if os.path.exists(poster_path):
+        return poster_path
+    return generate_poster(video_filename)
+
+
+def resolve_video_path(video_filename):
+    """영상 파일의 실제 경로를 반환합니다. 보관된 영상이면 보관 경로를 반환합니다."""
+    video_path = os.path.join(VIDEOS_DIR, video_filename)
+    if os.path.exists(video_path):
+        return video_path
+
+    archived_path = os.path.join(ARCHIVE_DIR, video_filename)
+    if os.path.exists(archived_path):
+        return archived_path
+
+    return video_path
+
+
+def _iter_storage_files():
+    """관리 대상 파일을 (경로, 종류) 형태로 반환합니다."""
+    if os.path.isdir(VIDEOS_DIR):
+        for name in os.listdir(VIDEOS_DIR):
+            path = os.path.join(VIDEOS_DIR, name)
+            if os.path.isfile(path):
+                yield path, "original"
+
+    if os.path.isdir(ARCHIVE_DIR):
+        for name in os.listdir(ARCHIVE_DIR):
+            path = os.path.join(ARCHIVE_DIR, name)
+            if os.path.isfile(path):
+                yield path, "archived"
+
+    for kind in DERIVED_KINDS:
+        directory = os.path.join(DERIVED_DIR, kind)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path):
+                    yield path, "derived"
+
+
+def scan_storage(index_path=STORAGE_INDEX_PATH):
+    """디스크를 확인하여 파일별 용량 정보를 갱신합니다.
+
+    새 파일은 수정 시간을 최근 접근 시간으로 사용하고,
+    사라진 파일은 목록에서 제거합니다. 바뀐 내용이 있을 때만 저장합니다.
+    """
+    old_index = load_storage_index(index_path)
+    index = {}
+
+    for path, kind in _iter_storage_files():
+        stat = os.stat(path)
+        entry = old_index.get(path, {})
+        index[path] = {
+            "kind": kind,
+            "size": stat.st_size,
+            "last_access": entry.get(
+                "last_access",
+                datetime.fromtimestamp(stat.st_mtime).strftime(TIME_FORMAT)
+            )
+        }
+
+    if index != old_index:
+        save_storage_index(index, index_path)
+    return index
+
+
+def touch_files(paths, index_path=STORAGE_INDEX_PATH):
+    """여러 파일의 최근 접근 시간을 현재 시각으로 기록합니다. (인덱스는 한 번만 저장)
+
+    영상을 실제로 재생하거나 선택했을 때만 호출해야 합니다.
+    """
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return
+
+    index = load_storage_index(index_path)
+    now = datetime.now().strftime(TIME_FORMAT)
+
+    for path in paths:
+        entry = index.get(path)
+        if entry is None:
+            kind = "original"
+            if path.startswith(DERIVED_DIR):
+                kind = "derived"
+            elif path.startswith(ARCHIVE_DIR):
+                kind = "archived"
+            entry = {"kind": kind, "size": os.path.getsize(path)}
+
+        entry["last_access"] = now
+        index[path] = entry
+
+    save_storage_index(index, index_path)
+
+
+def touch_file(path, index_path=STORAGE_INDEX_PATH):
+    """파일의 최근 접근 시간을 현재 시각으로 기록합니다."""
+    touch_files([path], index_path)
+
+
+def _device_of(path):
+    """경로(또는 가장 가까운 상위 디렉토리)가 있는 장치 번호를 반환합니다."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev
+
+
+def archive_is_separate_volume():
+    """보관 디렉토리가 영상 디렉토리와 다른 디스크(볼륨)에 있는지 확인합니다."""
+    return _device_of(ARCHIVE_DIR) != _device_of(VIDEOS_DIR)
+
+
+def quota_usage(index):
+    """할당량 계산에 포함되는 용량(바이트)을 반환합니다.
+
+    보관 디렉토리가 다른 볼륨에 있으면 보관된 영상은 이 디스크를
+    차지하지 않으므로 제외합니다.
+    """
+    exclude_archived = archive_is_separate_volume()
+    return sum(
+        entry["size"] for entry in index.values()
+        if not (exclude_archived and entry["kind"] == "archived")
+    )
+
+
+def get_storage_usage(index=None):
+    """종류별 파일 수와 용량(바이트)을 반환합니다."""
+    if index is None:
+        index = load_storage_index()
+
+    usage = {kind: {"count": 0, "size": 0} for kind in ["original", "archived", "derived"]}
+    for entry in index.values():
+        stats = usage.setdefault(entry["kind"], {"count": 0, "size": 0})
+        stats["count"] += 1
+        stats["size"] += entry["size"]
+
+    usage["total"] = {
+        "count": sum(stats["count"] for stats in usage.values()),
+        "size": sum(stats["size"] for stats in usage.values())
+    }
+    return usage
+
+
+def enforce_quota(quota_mb=None, index_path=STORAGE_INDEX_PATH):
+    """사용량이 할당량을 넘으면 파생 파일을 오래 사용하지 않은 순서로 삭제합니다.
+
+    원본 영상은 삭제하지 않습니다. 삭제된 파일 목록, 정리 후 사용량,
+    할당량, 여전히 초과 상태인지 여부를 반환합니다. 파생 파일을 모두
+    지워도 초과 상태이면 over_quota가 True입니다.
+    """
+    if quota_mb is None:
+        quota_mb = STORAGE_QUOTA_MB
+    quota_bytes = quota_mb * 1024 * 1024
+
+    index = scan_storage(index_path)
+    total = quota_usage(index)
+
+    derived = sorted(
+        (path for path, entry in index.items() if entry["kind"] == "derived"),
+        key=lambda path: index[path]["last_access"]
+    )
+
+    removed = []
+    for path in derived:
+        if total <= quota_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= index.pop(path)["size"]
+        removed.append(path)
+
+    if removed:
+        save_storage_index(index, index_path)
+
+    return {
+        "evicted": removed,
+        "used": total,
+        "quota": quota_bytes,
+        "over_quota": total > quota_bytes
+    }
+
+
+def archive_old_videos(days=None, index_path=STORAGE_INDEX_PATH):
+    """최근 접근 시간이 기준일보다 오래된 원본 영상을 보관 디렉토리로 옮깁니다.
+
+    보관된 영상도 resolve_video_path()로 계속 재생할 수 있습니다.
+    보관 디렉토리가 같은 디스크에 있으면 옮겨도 공간이 늘지 않으므로
+    아무것도 하지 않습니다. 보관된 파일 이름 목록을 반환합니다.
+    """
+    if not archive_is_separate_volume():
+        return []
+
+    if days is None:
+        days = ARCHIVE_AFTER_DAYS
+    cutoff = (datetime.now() - timedelta(days=days)).strftime(TIME_FORMAT)
+
+    index = scan_storage(index_path)
+    archived = []
+
+    for path, entry in list(index.items()):
+        if entry["kind"] != "original" or entry["last_access"] >= cutoff:
+            continue
+
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        filename = os.path.basename(path)
+        archived_path = os.path.join(ARCHIVE_DIR, filename)
+        shutil.move(path, archived_path)
+
+        index.pop(path)
+        index[archived_path] = dict(entry, kind="archived")
+        archived.append(filename)
+
+    save_storage_index(index, index_path)
+    return archived
+
+
+def _load_referenced_videos(metadata_path):
+    """메타데이터에 등록된 영상 파일명 집합을 반환합니다. 읽을 수 없으면 None을 반환합니다."""
+    if not os.path.exists(metadata_path):
+        return None
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+    except:
+        return None
+    if not isinstance(rows, list):
+        return None
+    return {row.get("파일명") for row in rows if isinstance(row, dict) and row.get("파일명")}
+
+
+def collect_garbage(dry_run=False, index=None, metadata_path=VIDEOS_METADATA_PATH,
+                    index_path=STORAGE_INDEX_PATH):
+    """videos_metadata.json에 없는 영상과 그 영상의 파생 파일을 삭제합니다.
+
+    메타데이터 파일을 읽을 수 없으면 아무것도 삭제하지 않습니다.
+    dry_run이 True이면 아무것도 쓰지 않고 삭제할 파일 목록만 반환합니다.
+    이미 scan_storage()로 읽은 index를 넘기면 디렉토리를 다시 확인하지 않습니다.
+    """
+    referenced = _load_referenced_videos(metadata_path)
+    if referenced is None:
+        return []
+
+    if index is None:
+        index = scan_storage(index_path)
+    grace_cutoff = datetime.now().timestamp() - GC_GRACE_SECONDS
+
+    orphans = []
+    for path, entry in index.items():
+        filename = os.path.basename(path)
+        if entry["kind"] == "derived":
+            source = filename.rsplit(".", 1)[0]
+            if source in referenced:
+                continue
+        elif filename in referenced:
+            continue
+
+        # 업로드 중이거나 방금 저장된 파일은 건너뜀
+        if not os.path.exists(path) or os.path.getmtime(path) > grace_cutoff:
+            continue
+        orphans.append(path)
+
+    if dry_run:
+        return orphans
+
+    for path in orphans:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        index.pop(path, None)
+
+    if orphans:
+        save_storage_index(index, index_path)
+    return orphans
+
+
+def run_storage_maintenance(quota_mb=None, archive_days=None):
+    """고아 파일 정리, 오래된 영상 보관, 할당량 적용을 차례로 실행합니다.
+
+    보관 디렉토리가 같은 디스크에 있으면 보관을 건너뛰고 archive_skipped를 True로 반환합니다.
+    """
+    deleted = collect_garbage()
+    archive_skipped = not archive_is_separate_volume()
+    archived = archive_old_videos(archive_days)
+    quota = enforce_quota(quota_mb)
+    return dict(quota, deleted=deleted, archived=archived, archive_skipped=archive_skipped)
@@ -20,6 +20,64 @@ def load_records(filepath="data/records.json"):
     return pd.DataFrame()
 
 
+def iter_records(filepath="data/records.json", chunk_size=1000):
+    """기록 데이터를 chunk_size개씩 나누어 읽습니다.
+
+    파일 전체를 메모리에 올리지 않고 JSON 배열을 조금씩 읽어
+    행(dict) 목록을 차례로 반환합니다. 파일이 잘렸거나 형식이 잘못되어
+    끝까지 읽을 수 없으면 ValueError를 발생시킵니다.
+    """
+    if not os.path.exists(filepath):
+        return
+
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer = f.read(65536).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            raise ValueError(f"{filepath}: JSON 배열 형식이 아닙니다.")
+        pos = 1
+        eof = False
+        chunk = []
+        row_count = 0
+
+        while True:
+            # 공백과 구분자 건너뛰기
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == ']':
+                break
+
+            try:
+                if pos >= len(buffer):
+                    raise ValueError
+                row, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{filepath}: {row_count}번째 행 이후의 데이터를 읽을 수 없습니다. (파일이 잘렸거나 형식이 잘못됨)")
+                # 행이 잘렸으면 다음 블록을 이어서 읽음
+                data = f.read(65536)
+                eof = not data
+                buffer = buffer[pos:] + data
+                pos = 0
+                continue
+
+            if not isinstance(row, dict):
+                raise ValueError(f"{filepath}: {row_count + 1}번째 행이 객체(dict) 형식이 아닙니다.")
+
+            chunk.append(row)
+            row_count += 1
+            pos = end
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+
 def save_records(df, filepath="data/records.json"):
     """기록 데이터를 저장합니다."""
     os.makedirs(os.path.dirname(filepath), exist_ok=True)